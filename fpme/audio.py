@@ -19,6 +19,7 @@ def audio_device_by_name(name: str, api=None):
 
 
 DIR = os.path.join(os.path.dirname(__file__), "../sound/ansagen/")
+ANNOUNCEMENT_FILE = DIR + "ansage.wav"  # text-to-speech output, overwritten by each announcement
 impulse_response = AudioSegment.from_file(DIR + "IR_DUBWISE E001 M2S.wav")
 ir_samples = np.array(impulse_response.get_array_of_samples(), dtype=np.float32) / (2**15)
 impulse_data = np.reshape(ir_samples, (-1, impulse_response.channels))
@@ -49,14 +50,11 @@ def play_announcement(text: str, device_index: Optional[int] = None):
         print("No German voice found. Using default voice.")
     engine.setProperty('rate', 140)  # Speed of speech
     engine.setProperty('volume', 1.0)  # Volume (0.0 to 1.0)
-    if not os.path.exists('output'):
-        os.makedirs('output')
-    file_path = os.path.join(DIR + "ansage.wav")
-    engine.save_to_file(text, file_path)
+    engine.save_to_file(text, ANNOUNCEMENT_FILE)
     # time.sleep(gong_duration)
     engine.runAndWait()
     # sd.wait()
-    play_audio(file_path, device_index, blocking=True, reverb=True, gong=True)
+    play_audio(ANNOUNCEMENT_FILE, device_index, blocking=True, reverb=True, gong=True)
     sd.wait()
 
 
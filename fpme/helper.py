@@ -1,3 +1,4 @@
+import math
 import threading
 import time
 from typing import Callable
@@ -34,3 +35,22 @@ def fit_image_size(img_res, max_width, max_height):
         return max_width, int(round(img_res[1] * max_width / img_res[0]))
     else:  # narrow image: fit height
         return int(round(img_res[0] * max_height / img_res[1])), max_height
+
+
+_HEX = ["%02x" % i for i in range(256)]  # two-digit hex by channel value, used by tk_rgb()
+
+
+def tk_rgb(r, g, b):
+    return "#" + _HEX[r] + _HEX[g] + _HEX[b]
+
+
+FADE_DURATION = 5.5  # s until an exponential highlight fade is below one colour step (ln 255)
+GREEN_FADE = [tk_rgb(i, 255, i) for i in range(256)]  # background by fade level, from full green to white
+RED_FADE = [tk_rgb(255, i, i) for i in range(256)]  # background by fade level, from full red to white
+_FADE_LEVEL = [int(255 * (1 - math.exp(-i / 100))) for i in range(int(FADE_DURATION * 100))]  # fade level by event age in 10 ms steps
+
+
+def fade_level(age: float) -> int:
+    """ Highlight fade level between 0 (just happened) and 255 (faded out) for an event `age` seconds ago. """
+    i = max(0, int(age * 100))  # events from other threads may be stamped slightly after `now`
+    return _FADE_LEVEL[i] if i < len(_FADE_LEVEL) else 255
@@ -5,6 +5,7 @@ Cross-platform unlike winusb. Both can read messages from VR-Park controllers in
 """
 import time
 from functools import partial
+from itertools import count
 from threading import Thread
 from typing import List, Dict, Optional, Set
 
@@ -12,6 +13,7 @@ import pywinusb.hid as hid
 
 from fpme.terminus import Terminus, play_special_announcement
 from fpme.train_control import TrainControl
+from fpme.train_def import Train
 
 
 class InputManager:
@@ -22,6 +24,9 @@ class InputManager:
         self.connected: Dict[str, Optional[hid.HidDevice]] = {}
         self.disconnected: Set[str] = set()
         self.last_events: Dict[str, Tuple[float, str]] = {}  # (time, text)
+        self._last_pressed: Dict[str, int] = {}  # device path -> button id of the last report, to detect new presses
+        self.version = 0  # increases whenever last_events or disconnected change
+        self._versions = count(1)  # next() is atomic, unlike += from the reader and detection threads
 
     def set_terminus(self, terminus: Terminus):
         self.terminus = terminus
@@ -34,18 +39,22 @@ class InputManager:
             if path not in controllers:
                 del self.connected[path]
                 self.disconnected.add(path)
+                self.version = next(self._versions)
         # --- Add new controllers ---
         for device in [dev for path, dev in controllers.items() if path not in self.connected]:
             try:
                 device.open()
                 print(f"Opened new controller: {device.device_path}")
-                if device.device_path not in CONTROLS:
+                train = CONTROLS.get(device.device_path)
+                if train is None:
                     print("This controller has not been assigned to any train! Copy the following Python path")
                     print("'" + device.device_path.replace("\\", "\\\\") + "'")
-                device.set_raw_data_handler(partial(self.process_event, device_path=device.device_path))
+                device.set_raw_data_handler(partial(self.process_event, device_path=device.device_path, train=train))  # resolve the train once, not per report
                 if device.device_path in self.disconnected:
                     self.disconnected.remove(device.device_path)
+                self._last_pressed.pop(device.device_path, None)
                 self.last_events[device.device_path], self.connected[device.device_path] = (time.perf_counter(), 'connected'), device
+                self.version = next(self._versions)
             except OSError as e:
                 print(f"Failed to open bluetooth controller: {e}")
                 self.connected[device.device_path] = None
@@ -57,34 +66,39 @@ class InputManager:
                 time.sleep(interval_sec)
         Thread(target=detection_loop).start()
 
-    def process_event(self, data: List, device_path: str):
+    def process_event(self, data: List, device_path: str, train: Optional[Train] = None):
         # data is always [4, 127, 127, 127, 128, button_id, 0, hat, 0]
-        train = CONTROLS.get(device_path)
+        _, _, _, _, _, pressed, _, hat, _ = data
+        new_press = self._last_pressed.get(device_path) != pressed  # held buttons must not trigger reverse, terminus or ability again
+        self._last_pressed[device_path] = pressed
         if self.control is None or train is None:
             self.last_events[device_path] = (time.perf_counter(), str(data))
+            self.version = next(self._versions)
             return
-        _, _, _, _, _, pressed, _, hat, _ = data
         hat_pos = VECTOR[hat]
         self.control.set_acceleration_control(train, 'VR-Park', hat_pos[1], cause=device_path)
         if pressed == 16:  # Button A / Trigger 2
             self.control.emergency_stop(train, cause=device_path)
             event_text = "A (stop)"
         elif pressed == 1:  # Button B / Trigger 1
-            self.control.reverse(train, cause=device_path)
+            if new_press:
+                self.control.reverse(train, cause=device_path)
             event_text = "B (reverse)"
         elif pressed == 8:  # Button C
-            if self.terminus:
-                self.terminus.request_entry(train)
-                # self.control.emergency_stop_all(train, cause=device_path)
-            else:
-                print("no terminus set")
+            if new_press:
+                if self.terminus:
+                    self.terminus.request_entry(train)
+                    # self.control.emergency_stop_all(train, cause=device_path)
+                else:
+                    print("no terminus set")
             event_text = "C (terminus)"
         elif pressed == 2:  # Button D
-            if train.primary_ability is not None:
-                if self.control[train].can_use_primary_ability:
-                    self.control.use_ability(train, cause=device_path)
-            else:  # Schienenbus
-                play_special_announcement()
+            if new_press:
+                if train.primary_ability is not None:
+                    if self.control[train].can_use_primary_ability:
+                        self.control.use_ability(train, cause=device_path)
+                else:  # Schienenbus
+                    play_special_announcement()
             # self.control.power_on(None, cause=device_path)
             event_text = "D (Ability)"
         else:
@@ -94,6 +108,7 @@ class InputManager:
                 event_text = ""
         if event_text:
             self.last_events[device_path] = (time.perf_counter(), event_text)
+            self.version = next(self._versions)
 
 
 VECTOR = {
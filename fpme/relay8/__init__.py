@@ -54,21 +54,23 @@ class Relay8:
 
     def open_channel(self, channel, tries=3):
         with _LOCK:
-            code = NATIVE.usb_relay_device_open_one_relay_channel(self.handle, channel)
-            if code != 0:
-                warnings.warn(f"Relay8 {self.name}: open_channel({channel}) returned error {code}. tries={tries}")
-                if tries > 1:
+            for remaining in range(tries, 0, -1):
+                code = NATIVE.usb_relay_device_open_one_relay_channel(self.handle, channel)
+                if code == 0:
+                    return
+                warnings.warn(f"Relay8 {self.name}: open_channel({channel}) returned error {code}. tries={remaining}")
+                if remaining > 1:
                     time.sleep(0.001)
-                    Thread(target=self.open_channel, args=(channel, tries-1)).start()
 
     def close_channel(self, channel, tries=3):
         with _LOCK:
-            code = NATIVE.usb_relay_device_close_one_relay_channel(self.handle, channel)
-            if code != 0:
-                warnings.warn(f"Relay8 {self.name}: close_channel({channel}) returned error {code}. tries={tries}")
-                if tries > 1:
+            for remaining in range(tries, 0, -1):
+                code = NATIVE.usb_relay_device_close_one_relay_channel(self.handle, channel)
+                if code == 0:
+                    return
+                warnings.warn(f"Relay8 {self.name}: close_channel({channel}) returned error {code}. tries={remaining}")
+                if remaining > 1:
                     time.sleep(0.001)
-                    Thread(target=self.close_channel, args=(channel, tries-1)).start()
 
     def set_channel_open(self, channel: int, value: bool):
         if value:
@@ -76,6 +78,43 @@ class Relay8:
         else:
             self.close_channel(channel)
 
+    def set_channels(self, opened: Sequence[int] = (), closed: Sequence[int] = ()):
+        """
+        Opens and closes multiple channels, holding the device lock only once.
+        Failed channels are retried like in `open_channel()` and `close_channel()`.
+
+        Args:
+            opened: Channels to open
+            closed: Channels to close
+        """
+        failed = []
+        with _LOCK:
+            for channel in opened:
+                if NATIVE.usb_relay_device_open_one_relay_channel(self.handle, channel) != 0:
+                    failed.append((channel, True))
+            for channel in closed:
+                if NATIVE.usb_relay_device_close_one_relay_channel(self.handle, channel) != 0:
+                    failed.append((channel, False))
+        for channel, value in failed:
+            self.set_channel_open(channel, value)
+
+    def set_channels_mask(self, state: int, mask: int):
+        """
+        Sets the channels selected by `mask` to the corresponding bits of `state`.
+        Channels that are already in the requested state are not written.
+
+        Args:
+            state: Bit `i` set -> open channel `i+1`, cleared -> close it
+            mask: Bit `i` set -> channel `i+1` is affected
+        """
+        with _LOCK:
+            current = NATIVE.usb_relay_device_get_status_bitmap(self.handle)
+        changed = mask if current < 0 else (current ^ state) & mask  # status unknown -> write all
+        opened = [i + 1 for i in range(8) if changed >> i & 1 and state >> i & 1]
+        closed = [i + 1 for i in range(8) if changed >> i & 1 and not state >> i & 1]
+        if opened or closed:
+            self.set_channels(opened, closed)
+
     def close_all_channels(self):
         with _LOCK:
             NATIVE.usb_relay_device_close_all_relay_channel(self.handle)
@@ -1,8 +1,8 @@
 import os
 import threading
 import time
-from dataclasses import dataclass
-from multiprocessing import Value, Process, Queue, Manager
+from dataclasses import dataclass, field
+from multiprocessing import Value, Process, Queue, Manager, Semaphore
 from ctypes import c_char_p
 from typing import List, Dict, Tuple, Callable, Sequence
 
@@ -148,7 +148,10 @@ class GeneratorState:
     short_circuited: Value
     error_message: Value
     contacts: Tuple[Value, ...]  # 3 entries
+    contact_generation: Value  # incremented by the subprocess whenever one of the contacts changes
+    contact_changed: Semaphore  # released by the subprocess after each increment, acquired by the relay thread
     last_stopped: float = None  # mutable
+    contact_waiters: threading.Condition = field(default_factory=threading.Condition)  # notified by the relay thread, local to this process
 
 
 def list_com_ports(include_bluetooth=False):
@@ -172,14 +175,16 @@ class SubprocessGenerator:
         self._all_active = [Value('b', False) for _ in range(max_generators)]
         self._all_short_circuited = [Value('b', False) for _ in range(max_generators)]
         self._all_error = [self._manager.Value(c_char_p, "") for _ in range(max_generators)]
-        self._all_contact1 = [Value('b', False) for _ in range(max_generators)]
-        self._all_contact2 = [Value('b', False) for _ in range(max_generators)]
-        self._all_contact3 = [Value('b', False) for _ in range(max_generators)]
+        self._all_contact1 = [Value('b', False, lock=False) for _ in range(max_generators)]  # single writer, byte reads are atomic
+        self._all_contact2 = [Value('b', False, lock=False) for _ in range(max_generators)]
+        self._all_contact3 = [Value('b', False, lock=False) for _ in range(max_generators)]
+        self._all_contact_generation = [Value('i', 0, lock=False) for _ in range(max_generators)]  # single writer, int reads are atomic
+        self._all_contact_changed = [Semaphore(0) for _ in range(max_generators)]  # release() never blocks, unlike Event.set() which waits for woken waiters
 
     def setup(self):
         def async_setup():
             with self._manager:
-                self._process = Process(target=subprocess_main, args=(self._subprocess_run, self._all_active, self._all_short_circuited, self._all_error, (self._all_contact1, self._all_contact2, self._all_contact3)))
+                self._process = Process(target=subprocess_main, args=(self._subprocess_run, self._all_active, self._all_short_circuited, self._all_error, (self._all_contact1, self._all_contact2, self._all_contact3), self._all_contact_generation, self._all_contact_changed))
                 self._process.start()
                 self._process.join()
                 print("Child process terminated.")
@@ -188,10 +193,19 @@ class SubprocessGenerator:
     def open_port(self, serial_port: str, addresses: Tuple[int] = None):
         assert serial_port is not None, f"use the prefix 'debug' for fake ports instead of {serial_port}"
         i = len(self._generator_states)
-        state = GeneratorState(serial_port, addresses, active=self._all_active[i], short_circuited=self._all_short_circuited[i], error_message=self._all_error[i], contacts=(self._all_contact1[i], self._all_contact2[i], self._all_contact3[i]))
+        state = GeneratorState(serial_port, addresses, active=self._all_active[i], short_circuited=self._all_short_circuited[i], error_message=self._all_error[i], contacts=(self._all_contact1[i], self._all_contact2[i], self._all_contact3[i]), contact_generation=self._all_contact_generation[i], contact_changed=self._all_contact_changed[i])
         self._generator_states[serial_port] = state
+        threading.Thread(target=self._relay_contact_changes, args=(state,), name='Contact_Change_Relay').start()
         self._subprocess_run.put(('open_port', serial_port, addresses))
 
+    @staticmethod
+    def _relay_contact_changes(state: GeneratorState):
+        """ Wakes up local waiters so the signal sender never has to wait for this process when notifying. """
+        while True:
+            state.contact_changed.acquire()
+            with state.contact_waiters:
+                state.contact_waiters.notify_all()
+
     def get_open_ports(self) -> Tuple[str]:
         return tuple(self._generator_states.keys())
 
@@ -226,6 +240,29 @@ class SubprocessGenerator:
         state = self._generator_states[serial_port]
         return [bool(c.value) for c in state.contacts]
 
+    def contact_generation(self, serial_port: str) -> int:
+        """ Counter that increases whenever one of the contacts of `serial_port` changes. Read it before `contact_status()`. """
+        return self._generator_states[serial_port].contact_generation.value
+
+    def wait_for_contact_change(self, serial_port: str, timeout: float, generation: int) -> int:
+        """
+        Blocks until the contacts of `serial_port` have changed since `generation` or `timeout` seconds have passed.
+        Read `contact_status()` after this returns to get the new state.
+        Any number of threads can wait at the same time without missing changes.
+
+        Args:
+            serial_port: Port of the generator.
+            timeout: Maximum time to wait in seconds.
+            generation: Last value obtained from `contact_generation()` or this method.
+
+        Returns:
+            Current contact generation. Differs from `generation` if a contact changed.
+        """
+        state = self._generator_states[serial_port]
+        with state.contact_waiters:
+            state.contact_waiters.wait_for(lambda: state.contact_generation.value != generation, timeout)
+            return state.contact_generation.value
+
     def terminate(self):
         self._subprocess_run.put(('terminate',))
         time.sleep(.1)
@@ -241,6 +278,19 @@ class SubprocessGenerator:
         state = self._generator_states[serial_port]
         return state.error_message.value
 
+    def get_status(self, serial_port: str) -> Tuple[str, bool, bool]:
+        """
+        Reads everything a status display needs in one go, see `get_error()`, `is_short_circuited()` and `is_sending_on()`.
+
+        Returns:
+            error: Error message, empty string means no error
+            short_circuited: Whether the track is short-circuited or has no power
+            sending: Whether the signal is being sent, i.e. active and not short-circuited
+        """
+        state = self._generator_states[serial_port]
+        short_circuited = bool(state.short_circuited.value)
+        return state.error_message.value, short_circuited, bool(state.active.value) and not short_circuited
+
     def time_since_last_stopped(self, serial_port: str):
         state = self._generator_states[serial_port]
         if state.last_stopped is None:
@@ -254,8 +304,8 @@ class SubprocessGenerator:
 
 # ------------------ Executed in subprocess from here on --------------------
 
-def subprocess_main(queue: Queue, active, short_circuited, error, contacts):
-    main = SignalGenProcessInterface(active, short_circuited, error, *contacts)
+def subprocess_main(queue: Queue, active, short_circuited, error, contacts, contact_generation, contact_changed):
+    main = SignalGenProcessInterface(active, short_circuited, error, *contacts, contact_generation, contact_changed)
     while True:
         cmd = queue.get(block=True)
         #print(f"Subprocess received: {cmd}")
@@ -264,13 +314,15 @@ def subprocess_main(queue: Queue, active, short_circuited, error, contacts):
 
 class SignalGenProcessInterface:
 
-    def __init__(self, all_active, all_short_circuited, all_error, all_contact1, all_contact2, all_contact3):
+    def __init__(self, all_active, all_short_circuited, all_error, all_contact1, all_contact2, all_contact3, all_contact_generation, all_contact_changed):
         self.all_active = list(all_active)
         self.all_short_circuited = list(all_short_circuited)
         self.all_error = list(all_error)
         self.all_contact1 = list(all_contact1)
         self.all_contact2 = list(all_contact2)
         self.all_contact3 = list(all_contact3)
+        self.all_contact_generation = list(all_contact_generation)
+        self.all_contact_changed = list(all_contact_changed)
         self.generators: Dict[str, SignalGenerator] = {}
         self.addresses: Dict[str, Tuple[int]] = {}
         self.state: Dict[int, tuple] = {}
@@ -278,7 +330,7 @@ class SignalGenProcessInterface:
 
     def open_port(self, serial_port: str, addresses):
         assert serial_port not in self.generators
-        gen = SignalGenerator(serial_port, self.scheduler, self.all_active.pop(0), self.all_short_circuited.pop(0), self.all_error.pop(0), self.all_contact1.pop(0), self.all_contact2.pop(0), self.all_contact3.pop(0))
+        gen = SignalGenerator(serial_port, self.scheduler, self.all_active.pop(0), self.all_short_circuited.pop(0), self.all_error.pop(0), self.all_contact1.pop(0), self.all_contact2.pop(0), self.all_contact3.pop(0), self.all_contact_generation.pop(0), self.all_contact_changed.pop(0))
         for address, (speed, reverse, functions, protocol) in self.state.items():
             if addresses is None or address in addresses:
                 gen.set(address, speed, reverse, functions, protocol)
@@ -341,7 +393,7 @@ class ThreadScheduler:
 
 class SignalGenerator:
 
-    def __init__(self, serial_port: str, scheduler: ThreadScheduler, active: Value, short_circuited: Value, error_message: Value, contact1: Value, contact2: Value, contact3: Value):
+    def __init__(self, serial_port: str, scheduler: ThreadScheduler, active: Value, short_circuited: Value, error_message: Value, contact1: Value, contact2: Value, contact3: Value, contact_generation: Value, contact_changed: Semaphore):
         self.serial_port = serial_port
         self.protocol = Motorola2()
         self.scheduler = scheduler
@@ -356,6 +408,9 @@ class SignalGenerator:
         self._contact1 = contact1
         self._contact2 = contact2
         self._contact3 = contact3
+        self._contact_generation = contact_generation
+        self._contact_changed = contact_changed
+        self._contacts = (False, False, False)  # last values written to contact1-3
         self.stop_on_short_circuit = True
         self.on_short_circuit = lambda: print("Short circuit detected")  # function without parameters
         self._time_started_sending = None  # wait a bit before detecting short circuits
@@ -430,9 +485,12 @@ class SignalGenerator:
                 short_circuited = self._short_circuited.value
             else:
                 short_circuited = time.perf_counter() > self._time_started_sending + 0.1 and self._ser.getCTS()  # 0.1 seconds to test for short circuits
-                self._contact1.value = not self._ser.getRI()
-                self._contact2.value = not self._ser.getCD()
-                self._contact3.value = not self._ser.getDSR()
+                contacts = (not self._ser.getRI(), not self._ser.getCD(), not self._ser.getDSR())
+                if contacts != self._contacts:
+                    self._contacts = contacts
+                    self._contact1.value, self._contact2.value, self._contact3.value = contacts
+                    self._contact_generation.value += 1
+                    self._contact_changed.release()  # never blocks, waiters are woken by the main process
             self._short_circuited.value, newly_short_circuited = short_circuited, short_circuited and not self._short_circuited.value
             if self._short_circuited.value:
                 if newly_short_circuited and self.on_short_circuit is not None:
@@ -476,9 +534,13 @@ if __name__ == '__main__':
     #     if gen.is_short_circuited(PORT):
     #         print("no power")
     #     time.sleep(.1)
+    generation = gen.contact_generation(PORT)
+    print(gen.contact_status(PORT))
     while True:
-        time.sleep(.2)
-        print(gen.contact_status(PORT))
+        changed = gen.wait_for_contact_change(PORT, 1., generation)
+        if changed != generation:  # only print transitions
+            generation = changed
+            print(gen.contact_status(PORT))
 
     # for i in range(10):
     #     for f in [0, 1, 2, 3, 4]:
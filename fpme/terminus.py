@@ -1,14 +1,16 @@
 import json
-import os.path
+import os
 import random
 import time
+import traceback
 import warnings
+from concurrent.futures import ThreadPoolExecutor, Future
 from datetime import datetime, timedelta
-from random import choice
-from threading import Thread, Lock
-from typing import Optional, List
+from functools import lru_cache
+from threading import Lock
+from typing import Optional, Dict, Tuple
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from fpme.audio import play_announcement
 from fpme.helper import schedule_at_fixed_rate
@@ -16,6 +18,15 @@ from fpme.relay8 import Relay8, RelayManager
 from fpme.train_control import TrainControl
 from fpme.train_def import Train, TRAINS_BY_NAME, ICE, S, E_RB, E_BW_IC, E40_RE_BLAU
 
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:  # orjson is optional, fall back to the standard library
+    def json_dumps(data) -> bytes:
+        return json.dumps(data, separators=(',', ':')).encode('utf-8')  # compact, no indent, so the C encoder is used
+    json_loads = json.loads
+
+PLATFORMS = (1, 2, 3, 4, 5)
+
 SWITCH_STATE = {
     1: {6: False, 8: True},  # True -> open_channel, False -> close_channel
     2: {6: False, 8: False},  # ToDo switch 4 not properly connected
@@ -23,11 +34,23 @@ SWITCH_STATE = {
     4: {6: True, 7: False, 8: False},
     5: {6: True, 7: False, 8: True},
 }
+SWITCH_MASK = {platform: sum(1 << (c - 1) for c in state) for platform, state in SWITCH_STATE.items()}  # bit i -> channel i+1
+SWITCH_OPEN_BITS = {platform: sum(1 << (c - 1) for c, req_open in state.items() if req_open) for platform, state in SWITCH_STATE.items()}
 
 PREVENT_EXIT = {  # when entering platform x, train on platforms y must wait
-    1: [2, 3],
-    2: [3],
-    5: [4],
+    1: frozenset((2, 3)),
+    2: frozenset((3,)),
+    5: frozenset((4,)),
+}
+_EMPTY = frozenset()
+
+FUTURE_COLLISION_COST = .1
+PLATFORM_COST = {  # platform -> (weight of regional cost, weight of far-distance cost, number of future collisions)
+    1: (1, 0, 0),
+    2: (1, 0, 1),
+    3: (1, 0, 2),
+    4: (0, 1, 1),
+    5: (0, 1, 0),
 }
 
 ENTRY_SIGNAL = 3
@@ -35,6 +58,8 @@ ENTRY_POWER = 4
 
 SPEED_LIMIT = 60.
 
+_rng = random.Random()  # private generator for announcements, not shared with other users of `random`
+
 
 @dataclass
 class ParkedTrain:
@@ -43,6 +68,12 @@ class ParkedTrain:
     dist_request: float = None  # Signed distance when enter request was sent. None for trains set through the UI.
     dist_trip: float = None  # Signed distance when entering the switches
     dist_clear: float = None  # Signed distance when leaving the sensor, now fully on switches
+    entered_forward: Optional[bool] = field(default=None, init=False)  # cached by update_derived()
+    train_length: Optional[float] = field(default=None, init=False)  # cached by update_derived(), known once cleared
+    direction: int = field(default=-1, init=False)  # cached by update_derived(), +1 if entered_forward else -1
+
+    def __post_init__(self):
+        self.update_derived()
 
     @property
     def has_tripped(self):
@@ -52,29 +83,30 @@ class ParkedTrain:
     def has_cleared(self):
         return self.dist_clear is not None
 
-    @property
-    def train_length(self):
-        return abs(self.dist_clear - self.dist_trip) - 0.18  # detector track length
-
-    @property
-    def entered_forward(self):
-        if self.dist_clear is None:
-            return (self.dist_trip - self.dist_request) > 0
+    def update_derived(self):
+        """Recomputes `entered_forward` and `train_length`. Must be called whenever `dist_request`, `dist_trip` or `dist_clear` change."""
+        self.train_length = None
+        if self.dist_clear is not None:
+            cleared = self.dist_clear - self.dist_trip
+            self.entered_forward = cleared > 0
+            self.train_length = abs(cleared) - 0.18  # detector track length
+        elif self.dist_trip is not None and self.dist_request is not None:
+            self.entered_forward = (self.dist_trip - self.dist_request) > 0
         else:
-            return (self.dist_clear - self.dist_trip) > 0
+            self.entered_forward = None
+        self.direction = 1 if self.entered_forward else -1
 
     @property
     def was_entry_recorded(self):
         return self.dist_request is not None
 
     def get_position(self, current_signed_distance):
-        if not self.has_tripped:
+        if self.dist_trip is None:  # not tripped
             return None
-        delta = current_signed_distance - self.dist_trip
-        if not self.was_entry_recorded:
+        if self.dist_request is None:  # entry not recorded
             default_position = 200
-            return default_position - abs(delta - 200)
-        return delta if self.entered_forward else -delta
+            return default_position - abs(current_signed_distance - self.dist_trip - 200)
+        return (current_signed_distance - self.dist_trip) * self.direction
 
     def get_end_position(self, current_signed_distance):
         return self.get_position(current_signed_distance) - self.train_length
@@ -91,36 +123,61 @@ class Terminus:
         self.relay = relay
         self.control = control
         self.port = port
-        self.trains: List[ParkedTrain] = []
+        self.trains: Dict[Train, ParkedTrain] = {}  # in order of entry
         self.entering: Optional[ParkedTrain] = None
         self._request_lock = Lock()
+        self._state_dirty = False  # set whenever self.trains or their recorded distances change
+        self._saved_distances = ()  # signed distances of self.trains at the last save
+        self._save_lock = Lock()  # save_state() runs on the autosave thread and the GUI thread
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='Terminus')  # entries
+        self._announcer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='Terminus_Announcement')  # one at a time, they share the speech engine and sound file
         relay.close_all_channels()
         self.load_state()
-        for t in self.trains:
+        for t in self.trains.values():
             control.set_speed_limit(t.train, 'terminus', SPEED_LIMIT)
         schedule_at_fixed_rate(self.save_state, 5.)
         schedule_at_fixed_rate(self.check_exited, 1.)
 
     def save_state(self, *_args):
+        with self._save_lock:
+            self._save_state()
+
+    def _save_state(self):
+        dirty, self._state_dirty = self._state_dirty, False  # cleared before reading the trains, so changes from now on are saved next time
+        trains = tuple(self.trains.values())
+        states = self.control.states
+        distances = tuple(states[t.train].signed_distance for t in trains)
+        if not dirty and distances == self._saved_distances:
+            return  # nothing changed since the last save
         data = {
             'switches': [],
             'trains': [{
                 'name': t.train.name,
                 'platform': t.platform,
-                'dist': self.control[t.train].signed_distance,
+                'dist': dist,
                 'dist_request': t.dist_request,
                 'dist_trip': t.dist_trip,
                 'dist_clear': t.dist_clear,
-            } for t in self.trains]
+            } for t, dist in zip(trains, distances)]
         }
-        with open("terminus.json", 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent=2)
+        payload = json_dumps(data)
+        try:
+            with open("terminus.json.tmp", 'wb') as file:
+                file.write(payload)
+                file.flush()
+                os.fsync(file.fileno())  # contents must be on disk before the rename, else a power cut can leave an empty file
+            os.replace("terminus.json.tmp", "terminus.json")  # never leave a half-written state file
+        except OSError as exc:  # must not end the autosave schedule
+            self._state_dirty = True  # retry on the next call
+            warnings.warn(f"Failed to save terminus state: {exc}")
+            return
+        self._saved_distances = distances
 
     def load_state(self):
         if not os.path.isfile("terminus.json"):
             return
-        with open("terminus.json", 'r', encoding='utf-8') as file:
-            data = json.load(file)
+        with open("terminus.json", 'rb') as file:
+            data = json_loads(file.read())
         for train_data in data['trains']:
             train = TRAINS_BY_NAME[train_data['name']]
             platform = train_data['platform']
@@ -128,21 +185,27 @@ class Terminus:
             dist_trip = train_data['dist_trip']
             dist_clear = train_data['dist_clear']
             delta = self.control[train].signed_distance - train_data['dist']
-            self.trains.append(ParkedTrain(train, platform,
-                                           dist_request + delta if dist_request is not None else None,
-                                           dist_trip + delta if dist_trip is not None else None,
-                                           dist_clear + delta if dist_clear is not None else None))
+            self.trains[train] = ParkedTrain(train, platform,
+                                             dist_request + delta if dist_request is not None else None,
+                                             dist_trip + delta if dist_trip is not None else None,
+                                             dist_clear + delta if dist_clear is not None else None)
 
     def get_train_position(self, train: Train):
-        for t in self.trains:
-            if t.train == train:
-                return t.platform, t.get_position(self.control[train].signed_distance)
-        return None, None
+        t = self.trains.get(train)
+        if t is None:
+            return None, None
+        return t.platform, t.get_position(self.control[train].signed_distance)
+
+    def get_train_positions(self) -> Dict[Train, tuple]:
+        """ Like `get_train_position()` for all trains in the terminus at once. Trains that are not listed are outside. """
+        states = self.control.states
+        return {train: (t.platform, t.get_position(states[train].signed_distance)) for train, t in tuple(self.trains.items())}
 
     def set_occupied(self, platform: int, train: Train):
-        if any([t.train == train for t in self.trains]):
-            t = [t for t in self.trains if t.train == train][0]
+        t = self.trains.get(train)
+        if t is not None:
             t.platform = platform
+            self._state_dirty = True
             # position = t.get_position(self.control[train].signed_distance)
             # train_length = t.train_length
             # self.trains.remove(t)
@@ -151,106 +214,148 @@ class Terminus:
             position = 200
             train_length = 50
             t = ParkedTrain(train, platform, None, dist - position, dist - position + train_length + 0.18)
-            self.trains.append(t)
+            self.trains[train] = t
+            self._state_dirty = True
 
     def set_empty(self, platform: int):
-        self.trains = [t for t in self.trains if t.platform != platform]
+        for t in [t for t in self.trains.values() if t.platform == platform]:
+            self._remove(t)
+
+    def _remove(self, t: ParkedTrain):
+        if self.trains.get(t.train) is t:  # a stale entry must not remove a newer one of the same train
+            self.trains.pop(t.train, None)  # another thread may have removed it since
+            self._state_dirty = True
 
     def request_entry(self, train: Train):
-        print(self.trains)
+        print(list(self.trains.values()))
+        # --- decide under the lock, act on relays and trains after releasing it ---
+        previous = entering = platform = None
+        already_parked = False
         with self._request_lock:
             if self.entering:
                 if train == self.entering.train:  # clicked again, no effect
                     return
-                elif self.entering.has_tripped:
-                    print(f"Terminus: {train} cannot enter until {self.entering} has cleared switches")
-                    self.control.force_stop(train, "wait for previous train")  # Wait until previous train has passed
-                    return
-                else:  # Who is first? Previous one might have been an accident. Stop both, block entry
-                    print(f"Terminus: Conflict between {train} and {self.entering}")
-                    self.control.emergency_stop(train, f"Contested terminus entry: {train} vs {self.entering.train}")
-                    self.control.emergency_stop(self.entering.train, f"Contested terminus entry: {train} vs {self.entering.train}")
-                    self.relay.close_channel(ENTRY_SIGNAL)
-                    self.relay.close_channel(ENTRY_POWER)
+                previous, previous_tripped = self.entering, self.entering.has_tripped
+                if not previous_tripped:
                     self.entering = None
-                    self.free_exit()
-                    return
-            if any(t.train == train for t in self.trains):
+            elif train in self.trains:
+                already_parked = True
+            else:
+                platform = self.select_track(train)
+                if platform is not None:
+                    self.entering = entering = ParkedTrain(train, platform)
+                    entering.dist_request = self.control[train].signed_distance
+                    self.trains[train] = entering
+                    self._state_dirty = True
+        if previous is not None:
+            if previous_tripped:
+                print(f"Terminus: {train} cannot enter until {previous} has cleared switches")
+                self.control.force_stop(train, "wait for previous train")  # Wait until previous train has passed
+            else:  # Who is first? Previous one might have been an accident. Stop both, block entry
+                print(f"Terminus: Conflict between {train} and {previous}")
+                self.control.emergency_stop(train, f"Contested terminus entry: {train} vs {previous.train}")
+                self.control.emergency_stop(previous.train, f"Contested terminus entry: {train} vs {previous.train}")
+                self.relay.set_channels(closed=(ENTRY_SIGNAL, ENTRY_POWER))
+                self.free_exit()
+            return
+        if entering is None:
+            if already_parked:
                 print(f"{train} is already in terminus")
-                return
-            # --- prepare entry ---
-            platform = self.select_track(train)
-            print(f"Terminus: {train} assigned to platform {platform}")
-            if platform is None:  # cannot enter
+            else:  # cannot enter
+                print(f"Terminus: {train} assigned to platform {platform}")
                 self.control.force_stop(train, "no platform")
+            return
+        print(f"Terminus: {train} assigned to platform {platform}")
+
+        def process_entry(entering: ParkedTrain, duration=5, interval=0.05):  # contact changes wake up immediately, interval only paces distance checks
+            # --- prepare entry ---
+            self.control.set_speed_limit(train, 'terminus', SPEED_LIMIT)
+            self.prevent_exit(platform)
+            self.set_switches_for(platform)
+            with self._request_lock:  # a contested request closes the entry after resetting self.entering under this lock
+                cancelled = self.entering is not entering
+                if cancelled:
+                    self._remove(entering)
+                else:
+                    self.relay.set_channels(opened=(ENTRY_SIGNAL, ENTRY_POWER))
+            if cancelled:
+                print(f"Terminus: Entry of {train} was cancelled while setting switches")
+                self.free_exit()  # the contested request may have freed the exit before prevent_exit() above blocked it
                 return
-            self.entering = entering = ParkedTrain(train, platform)
-            entering.dist_request = self.control[train].signed_distance
-            self.trains.append(entering)
-        self.control.set_speed_limit(train, 'terminus', SPEED_LIMIT)
-        self.prevent_exit(platform)
-        self.set_switches_for(platform)
-        self.relay.open_channel(ENTRY_SIGNAL)
-        self.relay.open_channel(ENTRY_POWER)
-
-        def process_entry(entering: ParkedTrain, duration=5, interval=0.01):
-            for _ in range(int(duration / interval)):
-                if self.control.generator.contact_status(self.port)[0]:
-                    print(f"Terminus: Contact tripped. {entering}")
-                    entering.dist_trip = self.control[train].signed_distance
-                    if entering.dist_trip == entering.dist_request:
-                        entering.dist_request -= -1e-3 if self.control[train].is_in_reverse else 1e-3
-                    driven = entering.dist_trip - entering.dist_request
-                    if (self.control[train].speed > 0) != entering.entered_forward:
-                        warnings.warn(f"Train switched direction while entering? driven={driven}, speed={self.control[train].speed}")
-                    play_terminus_announcement(train, platform)
-                    def red_when_entered():
-                        while True:
-                            time.sleep(0.1)
-                            if entering.get_position(self.control[train].signed_distance) > 20:
-                                self.relay.close_channel(ENTRY_SIGNAL)  # red when train has driven for 20cm
-                                return
-                    Thread(target=red_when_entered).start()
-                    # --- wait for clear sensor ---
-                    while True:
-                        time.sleep(interval)
-                        if not self.control.generator.contact_status(self.port)[0]:  # possible sensor clear
-                            if entering.dist_clear is None:
-                                entering.dist_clear = self.control[train].signed_distance
-                                self.relay.close_channel(ENTRY_POWER)
-                        elif entering.dist_clear is not None and entering.get_end_position(self.control[train].signed_distance) < 30:  # another wheel entered
-                            entering.dist_clear = None
-                            self.relay.open_channel(ENTRY_POWER)
-                            continue
-                        # --- clear switches ---
-                        if self.entering.dist_clear is not None and entering.get_position(self.control[train].signed_distance) > 57:
-                            self.free_exit()
+            # --- wait for contact ---
+            state, generator, port = self.control[train], self.control.generator, self.port
+            deadline = time.perf_counter() + duration
+            generation = generator.contact_generation(port)  # read before the status so no change is missed
+            while not generator.contact_status(port)[0]:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:  # --- not tripped - maybe button pressed on accident or train too far ---
+                    self.relay.set_channels(closed=(ENTRY_SIGNAL, ENTRY_POWER))
+                    self.control.force_stop(train, "train did not enter terminus")
+                    with self._request_lock:
+                        if self.entering is entering:  # a contested request may already have reset it
                             self.entering = None
-                            return
-                time.sleep(interval)
-            # --- not tripped - maybe button pressed on accident or train too far ---
-            self.relay.close_channel(ENTRY_SIGNAL)
-            self.relay.close_channel(ENTRY_POWER)
-            self.control.force_stop(train, "train did not enter terminus")
-            self.entering = None
-            self.trains.remove(entering)
-        Thread(target=process_entry, args=(entering,)).start()
+                        self._remove(entering)
+                    return
+                generation = generator.wait_for_contact_change(port, remaining, generation)
+            print(f"Terminus: Contact tripped. {entering}")
+            entering.dist_trip = state.signed_distance
+            if entering.dist_trip == entering.dist_request:
+                entering.dist_request -= -1e-3 if state.is_in_reverse else 1e-3
+            entering.update_derived()
+            self._state_dirty = True
+            driven = entering.dist_trip - entering.dist_request
+            if (state.speed > 0) != entering.entered_forward:
+                warnings.warn(f"Train switched direction while entering? driven={driven}, speed={state.speed}")
+            self._run_async(play_terminus_announcement, train, platform, executor=self._announcer)
+            signal_red = False
+            # --- wait for clear sensor ---
+            while True:
+                generation = generator.wait_for_contact_change(port, interval, generation)
+                dist = state.signed_distance
+                pos = entering.get_position(dist)  # once per tick, reused by all checks below
+                if not signal_red and pos > 20:
+                    self.relay.close_channel(ENTRY_SIGNAL)  # red when train has driven for 20cm
+                    signal_red = True
+                if not generator.contact_status(port)[0]:  # possible sensor clear
+                    if entering.dist_clear is None:
+                        entering.dist_clear = dist
+                        entering.update_derived()
+                        pos = entering.get_position(dist)  # direction is now known from the full entry
+                        self._state_dirty = True
+                        self.relay.close_channel(ENTRY_POWER)
+                elif entering.dist_clear is not None and pos - entering.train_length < 30:  # another wheel entered
+                    entering.dist_clear = None
+                    entering.update_derived()
+                    self._state_dirty = True
+                    self.relay.open_channel(ENTRY_POWER)
+                    continue
+                # --- clear switches ---
+                if entering.dist_clear is not None and pos > 57:
+                    self.free_exit()
+                    with self._request_lock:
+                        if self.entering is entering:
+                            self.entering = None
+                    return
+        self._run_async(process_entry, entering, executor=self._executor)
+
+    def _run_async(self, function, *args, executor: ThreadPoolExecutor):
+        executor.submit(function, *args).add_done_callback(_print_exception)
 
     def check_exited(self, *_args):
-        for t in tuple(self.trains):
-            if t.has_cleared:
-                pos = t.get_position(self.control[t.train].signed_distance)
+        states = self.control.states
+        for t in tuple(self.trains.values()):
+            if t.dist_clear is not None:  # cleared
+                pos = t.get_position(states[t.train].signed_distance)
                 exited = pos < 0
                 if exited:
-                    self.trains.remove(t)
+                    self._remove(t)
                     self.control.set_speed_limit(t.train, 'terminus', None)
 
     def set_switches_for(self, platform: int):
         self.relay.open_channel(5)
         time.sleep(.1)
-        for channel, req_open in SWITCH_STATE[platform].items():
-            self.relay.set_channel_open(channel, req_open)
-            time.sleep(.1)
+        self.relay.set_channels_mask(SWITCH_OPEN_BITS[platform], SWITCH_MASK[platform])
+        time.sleep(.1)
         #self.relay.pulse(5)
         self.relay.close_channel(5)
 
@@ -261,23 +366,25 @@ class Terminus:
             self.relay.close_channel(1)  # Platforms 2, 3
         elif entering_platform == 5:
             self.relay.close_channel(2)  # Platform 4
-        trains = [t for t in self.trains if t.platform in PREVENT_EXIT.get(entering_platform, [])]
+        waiting_platforms = PREVENT_EXIT.get(entering_platform, _EMPTY)
+        trains = [t for t in tuple(self.trains.values()) if t.platform in waiting_platforms]
+        states = self.control.states
         for t in trains:
-            if (self.control[t.train].speed < 0) == t.entered_forward:
+            if (states[t.train].speed < 0) == t.entered_forward:
                 self.control.emergency_stop(t.train, 'terminus-conflict')
                 self.control.set_speed_limit(t.train, 'terminus-wait', 0)
 
     def free_exit(self):
-        self.relay.open_channel(1)  # Platforms 2, 3
-        self.relay.open_channel(2)  # Platform 4
-        for t in self.trains:
-            self.control.set_speed_limit(t.train, 'terminus-wait', None)
+        self.relay.set_channels(opened=(1, 2))  # 1: Platforms 2, 3; 2: Platform 4
+        for train in tuple(self.trains):
+            self.control.set_speed_limit(train, 'terminus-wait', None)
 
     def get_platform_state(self):
         """For each platform returns one of (empty, parked, entering, exiting) """
-        state = {i: 'empty' for i in range(1, 6)}
-        for t in self.trains:
-            speed = self.control[t.train].speed
+        state = dict.fromkeys(PLATFORMS, 'empty')
+        states = self.control.states
+        for train, t in tuple(self.trains.items()):
+            speed = states[train].speed
             if speed == 0:
                 state[t.platform] = 'parked'
             elif (speed > 0) == t.entered_forward:
@@ -289,27 +396,10 @@ class Terminus:
     def select_track(self, train: Train) -> Optional[int]:
         """ Returns `None` if the train cannot enter because of collisions. """
         state = self.get_platform_state()
-        can_enter = {
-            1: state[1] == 'empty' and state[2] != 'exiting' and state[3] != 'exiting',
-            2: state[2] == 'empty' and state[3] != 'exiting',
-            3: state[3] == 'empty',
-            4: state[4] == 'empty',
-            5: state[5] == 'empty' and state[4] != 'exiting',
-        }
-        can_enter = [p for p, c in can_enter.items() if c]
-        if not can_enter:
-            return None
-        future_collision_cost = .1
-        cost_regional = 1 - train.regional_fac
-        cost_far_distance = train.regional_fac
-        base_cost = {
-            1: cost_regional,
-            2: cost_regional + future_collision_cost,
-            3: cost_regional + 2 * future_collision_cost,
-            4: cost_far_distance + future_collision_cost,
-            5: cost_far_distance,
-        }
-        cost = {p: base_cost[p] for p in can_enter}
+        for p, waiting_platforms in _platforms_by_cost(train):
+            if state[p] == 'empty' and all(state[w] != 'exiting' for w in waiting_platforms):  # trains exiting p's waiting platforms would collide
+                return p
+        return None
         # cost = {}
         # for track in [t for t, c in can_enter.items() if c]:
         #     wait_cost = 0
@@ -321,55 +411,84 @@ class Terminus:
         #                 wait_cost += ...  # ToDo maximum cost at 5-10 seconds after parking
         #     # ToDo check that trains currently on the track (not in terminus) can be assigned a proper track (e.g. keep 4/5 open for ICE) Weighted by expected arrival time.
         #     cost[track] = base_cost[track] + wait_cost
-        return min(cost, key=cost.get)
 
 
-def play_terminus_announcement(train: Train, platform: int):
-    targets = {
-        ICE: {
-            1: ('I C E, 86',  'Waldbrunn'),
-            2: ('I C E, 109', 'Heilbronn, über: Waldbrunn'),
-            3: ('I C E, 170', 'Böblingen, über: Waldbrunn'),
-            4: ('I C E, 18',  'Wiesbaden, über: Böblingen'),
-            5: ('I C E, 34',  'Radeburg, über: Wiesbaden'),
-        },
-        S: {
-            1: ('S 3', "Kirchbach"),
-            2: ('S 5', "Waldbrunn"),
-            3: ('S 1', "Heilbronn"),
-            4: ('S 2', "Böblingen"),
-            5: ('S 4', "Grünstein"),
-        },
-        E_BW_IC: {
-            1: ("Intercity", ""),
-            2: ("", ""),
-            3: ("", ""),
-            4: ("", ""),
-            5: ("", ""),
-        },
-        E_RB: {
-            1: ("Regionalbahn", ""),
-            2: ("", ""),
-            3: ("", ""),
-            4: ("", ""),
-            5: ("", ""),
-        },
-        E40_RE_BLAU: {
-            1: ("Regional-Express", ""),
-            2: ("", ""),
-            3: ("", ""),
-            4: ("", ""),
-            5: ("", ""),
-        }
+@lru_cache(maxsize=None)
+def _platforms_by_cost(train: Train) -> Tuple[Tuple[int, frozenset], ...]:
+    """ (platform, waiting platforms) sorted by base cost for `train`. Only depends on the fixed `regional_fac`. """
+    cost_regional = 1 - train.regional_fac
+    cost_far_distance = train.regional_fac
+    cost = {p: regional * cost_regional + far_distance * cost_far_distance + collisions * FUTURE_COLLISION_COST
+            for p, (regional, far_distance, collisions) in PLATFORM_COST.items()}
+    return tuple((p, PREVENT_EXIT.get(p, _EMPTY)) for p in sorted(cost, key=cost.get))
+
+
+CONNECTIONS = {  # train -> platform -> (connection, target)
+    ICE: {
+        1: ('I C E, 86',  'Waldbrunn'),
+        2: ('I C E, 109', 'Heilbronn, über: Waldbrunn'),
+        3: ('I C E, 170', 'Böblingen, über: Waldbrunn'),
+        4: ('I C E, 18',  'Wiesbaden, über: Böblingen'),
+        5: ('I C E, 34',  'Radeburg, über: Wiesbaden'),
+    },
+    S: {
+        1: ('S 3', "Kirchbach"),
+        2: ('S 5', "Waldbrunn"),
+        3: ('S 1', "Heilbronn"),
+        4: ('S 2', "Böblingen"),
+        5: ('S 4', "Grünstein"),
+    },
+    E_BW_IC: {
+        1: ("Intercity", ""),
+        2: ("", ""),
+        3: ("", ""),
+        4: ("", ""),
+        5: ("", ""),
+    },
+    E_RB: {
+        1: ("Regionalbahn", ""),
+        2: ("", ""),
+        3: ("", ""),
+        4: ("", ""),
+        5: ("", ""),
+    },
+    E40_RE_BLAU: {
+        1: ("Regional-Express", ""),
+        2: ("", ""),
+        3: ("", ""),
+        4: ("", ""),
+        5: ("", ""),
     }
-    if train in targets:
-        connection, target = targets[train][platform]
-        delay = max(0, random.randint(int(-train.max_delay * (1 - train.delay_rate)), train.max_delay))
+}
+ENTRY_ANNOUNCEMENT = "Gleis {platform}, Einfahrt. {connection}, nach: {target}, Abfahrt {hour} Uhr {minute}{delay_text}"
+DELAY_TEXT = ", heute circa {delay} Minuten später."
+NO_DELAY_TEXT = ". Vorsicht bei der Einfahrt."
+UNKNOWN_TRAIN_ANNOUNCEMENT = "Vorsicht auf Gleis {platform}, ein Zug fährt ein."
+MINUTE_TEXT = {
+    0: "",
+    5: "fünf",
+    10: "zehn",
+    15: "fünfzehn",
+    20: "zwanzig",
+    25: "fünfundzwanzig",
+    30: "dreißig",
+    35: "fünfunddreißig",
+    40: "vierzig",
+    45: "fünfundvierzig",
+    50: "fünfzig",
+    55: "fünfundfünfzig",
+}
+
+
+def play_terminus_announcement(train: Train, platform: int):
+    if train in CONNECTIONS:
+        connection, target = CONNECTIONS[train][platform]
+        delay = max(0, _rng.randint(int(-train.max_delay * (1 - train.delay_rate)), train.max_delay))
         hour, minute, delay = delayed_now(delay)
-        delay_text = f", heute circa {delay} Minuten später." if delay else ". Vorsicht bei der Einfahrt."
-        play_announcement(f"Gleis {platform}, Einfahrt. {connection}, nach: {target}, Abfahrt {hour} Uhr {minute}{delay_text}", None)
+        delay_text = DELAY_TEXT.format(delay=delay) if delay else NO_DELAY_TEXT
+        play_announcement(ENTRY_ANNOUNCEMENT.format(platform=platform, connection=connection, target=target, hour=hour, minute=minute, delay_text=delay_text), None)
     else:
-        play_announcement(f"Vorsicht auf Gleis {platform}, ein Zug fährt ein.")
+        play_announcement(UNKNOWN_TRAIN_ANNOUNCEMENT.format(platform=platform))
 
 
 def delayed_now(delay_minutes: int):
@@ -379,22 +498,14 @@ def delayed_now(delay_minutes: int):
     if minutes >= 60:
         dt += timedelta(hours=1)
         minutes = 0
-    minute_text = {
-        0: "",
-        5: "fünf",
-        10: "zehn",
-        15: "fünfzehn",
-        20: "zwanzig",
-        25: "fünfundzwanzig",
-        30: "dreißig",
-        35: "fünfunddreißig",
-        40: "vierzig",
-        45: "fünfundvierzig",
-        50: "fünfzig",
-        55: "fünfundfünfzig",
-    }
     dt = dt.replace(minute=minutes, second=0, microsecond=0) - timedelta(minutes=delay_minutes)
-    return dt.hour, minute_text[dt.minute], delay_minutes
+    return dt.hour, MINUTE_TEXT[dt.minute], delay_minutes
+
+
+def _print_exception(future: Future):
+    exc = future.exception()
+    if exc is not None:
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
 
 
 def play_special_announcement():
@@ -411,7 +522,7 @@ def play_special_announcement():
         "Achtung Passagiere des I C E 987, nach: Gotham Sittie. Bitte benutzen Sie ausschließlich Abschnitte D bis F., Grund hierfür ist ein Auftritt des Jokers in Abteil A.",
         "Achtung Passagiere des I C E 456, nach: Wunderland. Bitte folgen Sie dem weißen Kaninchen zum Gleis",
     ]
-    play_announcement(random.choice(sentences), language='German')
+    play_announcement(_rng.choice(sentences), language='German')
 
 
 if __name__ == '__main__':
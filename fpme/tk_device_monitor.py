@@ -1,15 +1,12 @@
-import math
 import time
+from typing import Dict
 
 import tkinter as tk
 
+from fpme.helper import tk_rgb, fade_level, GREEN_FADE
 from fpme.hid_input import InputManager
 
 
-def tk_rgb(r, g, b):
-    return "#%02x%02x%02x" % (r, g, b)
-
-
 def open_window():
     window = tk.Tk()
     window.title("Device Monitoring")
@@ -18,7 +15,7 @@ def open_window():
     def create_copiable_label(parent, text, copy_str: str, **kwargs):
         def copy(_event):
             window.clipboard_clear()
-            window.clipboard_append(text.replace("\\", "\\\\"))
+            window.clipboard_append(copy_str)
             print(f"Copied to clipboard: {copy_str}")
 
         label = tk.Label(parent, text=text[:30], **kwargs)
@@ -30,23 +27,32 @@ def open_window():
 
     table = tk.Frame(window)
     table.pack()
+    connected_table = tk.Frame(table)  # separate frames keep connected devices listed above disconnected ones
+    connected_table.pack()
+    disconnected_table = tk.Frame(table)
+    disconnected_table.pack()
+    connected_labels: Dict[str, tk.Label] = {}  # path -> label, patched in place instead of rebuilt every tick
+    disconnected_labels: Dict[str, tk.Label] = {}
+
+    def sync_labels(labels: Dict[str, tk.Label], paths, parent, bg):
+        for path in tuple(labels):
+            if path not in paths:
+                labels.pop(path).destroy()
+        for path in tuple(paths):
+            if path not in labels:
+                labels[path] = label = create_copiable_label(parent, text=path, copy_str=path.replace('\\', '\\\\'), bg=bg)
+                label.pack()
 
     def update_ui():
-        for widget in table.winfo_children():
-            widget.destroy()
-        for path in inputs.connected:
+        sync_labels(connected_labels, inputs.connected, connected_table, tk_rgb(0, 0, 0))
+        sync_labels(disconnected_labels, inputs.disconnected, disconnected_table, tk_rgb(255, 0, 0))
+        now = time.perf_counter()
+        for path, label in connected_labels.items():
             t, text = inputs.last_events[path]
-            fac = 1 - math.exp(t - time.perf_counter())
-            label = create_copiable_label(table, text=text+" "+path, copy_str=path.replace('\\', '\\\\'), bg=tk_rgb(0, 0, 0))
-            label.config(bg=tk_rgb(int(255 * fac), 255, int(255 * fac)))
-            label.pack()
-        for path in inputs.disconnected:
-            label = create_copiable_label(table, text=path, copy_str=path.replace('\\', '\\\\'), bg=tk_rgb(0, 0, 0))
-            label.config(bg=tk_rgb(255, 0, 0))
-            label.pack()
-        window.after(10, update_ui)
-
-    window.after(10, update_ui)
+            label.config(text=(text+" "+path)[:30], bg=GREEN_FADE[fade_level(now - t)])
+        window.after(100, update_ui)  # fading is smooth enough at 10 Hz
+
+    window.after(100, update_ui)
     window.mainloop()
 
 
@@ -1,13 +1,13 @@
-import math
 import os
 import time
 import tkinter as tk
 import tkinter.ttk as ttk
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
 
 from PIL import ImageTk, Image
 
-from .helper import fit_image_size
+from .helper import fit_image_size, fade_level, FADE_DURATION, GREEN_FADE, RED_FADE
 from .hid_input import InputManager, CONTROLS
 from .relay8 import RelayManager
 from .signal_gen import list_com_ports
@@ -16,9 +16,23 @@ from .train_control import TrainControl
 from .train_def import Train
 
 
+FRAME_INTERVAL = 20  # ms between updates while highlights fade or trains move
+IDLE_INTERVAL = 200  # ms between updates when nothing is animating
+STATUS_INTERVAL = 200  # ms between updates of the hardware and state labels, which only change on rare events
+PLATFORM_Y = (None, 15, 65, 115, 170, 220)  # canvas y of train images by platform
+SELECTED_PLATFORM_Y = (None, 12, 68, 118, 177, 224)  # canvas y of the selection marker by platform
+STATUS_OK = "✅"
+STATUS_SHORT_CIRCUITED = "⚠ short-circuited or no power"
+STATUS_PAUSED = "paused"
+STATUS_NOT_SENDING = "⚠"
+
+
 class TKGUI:
 
     def __init__(self, control: TrainControl, relays: RelayManager, inputs: InputManager, infos=(), fullscreen=False):
+        executor = ThreadPoolExecutor(thread_name_prefix='Thumbnail')  # resize while Tk builds the window, Pillow releases the GIL
+        thumbnails = {train: executor.submit(thumbnail, train) for train in {*CONTROLS.values(), *control.trains}}
+        executor.shutdown(wait=False)  # submitted resizes still complete
         self.control = control
         self.relays = relays
         self.terminus = None
@@ -26,9 +40,18 @@ class TKGUI:
         self.inputs = inputs
         self.window = tk.Tk()
         self.speed_bars: Dict[Train, ttk.Progressbar] = {}
+        self.speed_vars: Dict[Train, tk.DoubleVar] = {}  # values of speed_bars
         self.direction_labels: Dict[Train, tk.Label] = {}
         self.active_vars: Dict[Train, tk.IntVar] = {}
         self.shown_trains: List[Train] = []
+        self._widget_config: Dict[tk.Misc, tuple] = {}  # widget -> last configuration written by _set()
+        self._item_coords: Dict[int, tuple] = {}  # canvas item -> last coordinates written by _move()
+        self._events_version, self._events = -1, ()  # snapshot of inputs.last_events and its version
+        self._faded_events: Dict[str, float] = {}  # device -> time of its last event, once that highlight has fully faded
+        self._shown_active: Dict[Train, bool] = {}  # train -> value currently shown by its checkbox, dropped when the user clicks it
+        self._shown_train_states: Dict[Train, tuple] = {}  # train -> (speed, in reverse) currently displayed
+        self._cause_names = {device: train.name for device, train in CONTROLS.items()}  # input devices are shown by train name
+        self._cause_texts: Dict[tuple, str] = {}  # (prefix, cause) -> text, see _cause_text()
 
         self.window.title("Modellbahn Steuerung")
         self.window.geometry('800x840')
@@ -45,8 +68,9 @@ class TKGUI:
         hardware_pane.grid(row=1, column=0)
         self.status_labels = {}  # port -> Label
         row = 0
-        port_descriptions = {port: desc for port, desc, hwid in list_com_ports(include_bluetooth=True)}
-        for port in control.generator.get_open_ports():
+        self._open_ports = control.generator.get_open_ports()  # status labels exist only for these
+        port_descriptions = {port: desc for port, desc, hwid in list_com_ports(include_bluetooth=True)} if self._open_ports else {}  # skip the system scan without generators
+        for port in self._open_ports:
             tk.Label(hardware_pane, text=port).grid(row=row, column=0)
             tk.Label(hardware_pane, text=port_descriptions.get(port, 'Fake port')).grid(row=row, column=1)
             status_label = tk.Label(hardware_pane, text="unknown")
@@ -75,10 +99,12 @@ class TKGUI:
         controls_pane = tk.Frame(self.window)
         controls_pane.pack()
         self.last_action_labels = {}
-        self.photos = []
+        self.photos: Dict[Train, ImageTk.PhotoImage] = {train: ImageTk.PhotoImage(future.result()) for train, future in thumbnails.items()}  # shared by the controls and the terminus plan
+        managed, controlled = set(control.trains), set(CONTROLS.values())
         row = 0
         def add_progress_bar(train: Train):
-            progress_bar = ttk.Progressbar(controls_pane, value=50, length=100)
+            self.speed_vars[train] = speed_var = tk.DoubleVar(value=50)
+            progress_bar = ttk.Progressbar(controls_pane, variable=speed_var, length=100)
             progress_bar.grid(row=row, column=4)
             self.speed_bars[train] = progress_bar
             direction_label = tk.Label(controls_pane, text='')
@@ -87,26 +113,27 @@ class TKGUI:
         for device_path, train in CONTROLS.items():
             self.shown_trains.append(train)
             self.active_vars[train] = is_active = tk.IntVar(value=1)
+            is_active.trace_add('write', lambda *_, train=train: self._shown_active.pop(train, None))  # clicks are reverted by update_ui
             active = tk.Checkbutton(controls_pane, text=f"{row+1}", variable=is_active)
             active.grid(row=row, column=3)
-            photo = ImageTk.PhotoImage(train.image.resize(fit_image_size(train.img_res, 80, 30)))
-            self.photos.append(photo)
+            photo = self.photos[train]
             tk.Label(controls_pane, text=train.name, image=photo, compound=tk.LEFT).grid(row=row, column=2)
-            if train in control.trains:
+            if train in managed:
                 add_progress_bar(train)
             else:
-                tk.Label(controls_pane, text="not managed").grid(row=row, column=3)
+                tk.Label(controls_pane, text="not managed").grid(row=row, column=4)  # in place of the speed bar, column 3 holds the checkbox
             last_action_label = tk.Label(controls_pane, text='nothing')
             last_action_label.grid(row=row, column=6)
             last_action_label.config(width=9, height=2)
             self.last_action_labels[device_path] = last_action_label
             row += 1
         for train in control.trains:
-            if train not in CONTROLS.values():
+            if train not in controlled:
                 tk.Label(controls_pane, text=train.name).grid(row=row, column=2)
                 add_progress_bar(train)
                 row += 1
                 self.shown_trains.append(train)
+        self._train_view = [(train, self.speed_vars[train], self.direction_labels[train], 100 / train.max_speed) for train in control.trains]  # (train, speed bar variable, direction label, percent per km/h)
         # --- Status ---
         tk.Label(status_pane, text="State", font='Helvetica 14 bold').grid(row=0, column=2)
         tk.Label(text="Status (P/R)", font='Helvetica 14 bold').pack()
@@ -130,6 +157,7 @@ class TKGUI:
         self.canvas = tk.Canvas(terminus_pane, width=800, height=300)
         self.canvas.pack()
         image = Image.open("assets/Kopfbahnhof final.jpg")
+        image.draft('RGB', (800, 300))  # let the JPEG decoder downscale while decoding, before the exact resize
         image = image.resize((800, 300))
         photo_image = ImageTk.PhotoImage(image)  # Keep a reference to the image to prevent garbage collection
         self.canvas.create_image(0, 0, anchor=tk.NW, image=photo_image)
@@ -137,7 +165,7 @@ class TKGUI:
         self.canvas_images = {'__bg__': photo_image}
         self.canvas_ids = {}
         for train in control.trains:
-            train_photo = self.canvas_images[train.name] = ImageTk.PhotoImage(train.image.resize(fit_image_size(train.img_res, 80, 30)))
+            train_photo = self.canvas_images[train.name] = self.photos[train]
             self.canvas_ids[train] = self.canvas.create_image(0, 0, anchor=tk.NW, image=train_photo)
         # --- Hotkeys ---
         self.window.bind("<F11>", lambda e: self.window.attributes("-fullscreen", not self.window.attributes('-fullscreen')))
@@ -150,31 +178,27 @@ class TKGUI:
         self.window.bind("<+>", lambda e: self.control.set_global_speed_limit(None if self.control.speed_limit is None else (self.control.speed_limit + 20 if self.control.speed_limit < 240 else None)))
         self.window.bind("<minus>", lambda e: self.control.set_global_speed_limit(240 if self.control.speed_limit is None else self.control.speed_limit - 20))
         self.window.bind("<Escape>", lambda e: self.terminate())
-        self.window.bind("1", lambda e: self.terminus_set(0))
-        self.window.bind("2", lambda e: self.terminus_set(1))
-        self.window.bind("3", lambda e: self.terminus_set(2))
-        self.window.bind("4", lambda e: self.terminus_set(3))
-        self.window.bind("5", lambda e: self.terminus_set(4))
-        self.window.bind("6", lambda e: self.terminus_set(5))
-        self.window.bind("7", lambda e: self.terminus_set(6))
-        self.window.bind("8", lambda e: self.terminus_set(7))
-        self.window.bind("9", lambda e: self.terminus_set(8))
-        self.window.bind("0", lambda e: self.terminus_set(9))
-        self.window.bind("<Control-Key-1>", lambda e: self.terminus_select(1))
-        self.window.bind("<Control-Key-2>", lambda e: self.terminus_select(2))
-        self.window.bind("<Control-Key-3>", lambda e: self.terminus_select(3))
-        self.window.bind("<Control-Key-4>", lambda e: self.terminus_select(4))
-        self.window.bind("<Control-Key-5>", lambda e: self.terminus_select(5))
+        self.window.bind("<Key>", self._on_key)  # digits, more specific bindings above take precedence
         self.window.bind("<BackSpace>", lambda e: self.clear_platform())
         self.window.protocol("WM_DELETE_WINDOW", lambda: self.terminate())
 
     def launch(self):
-        self.window.after(10, self.update_ui)
+        self.window.after(FRAME_INTERVAL, self.update_ui)
+        self.window.after(FRAME_INTERVAL, self._update_status)
         self.window.mainloop()
 
     def set_terminus(self, terminus: Terminus):
         self.terminus = terminus
 
+    def _on_key(self, event):
+        if not event.keysym.isdigit():
+            return
+        digit = int(event.keysym)
+        if event.state & 0x4 and 1 <= digit <= 5:  # Control held
+            self.terminus_select(digit)
+        else:
+            self.terminus_set((digit - 1) % 10)  # keys 1-9, 0 select trains 0-9
+
     def terminus_select(self, platform: int):
         if self.terminus is not None:
             self.selected_platform = platform
@@ -195,71 +219,123 @@ class TKGUI:
 
     def update_ui(self):
         now = time.perf_counter()
+        fading_since = now - FADE_DURATION  # events after this are still being highlighted
+        busy = False  # whether anything is animating, i.e. the next update should come soon
+        control, states, set_ = self.control, self.control.states, self._set
         # --- Highlight recent inputs and detect disconnected devices ---
-        for device, (t, text) in self.inputs.last_events.items():
-            if device in self.last_action_labels:
-                label = self.last_action_labels[device]
-                if device in self.inputs.disconnected:
-                    label.config(text='disconnected', bg=tk_rgb(255, 0, 0))
+        last_action_labels, disconnected, faded = self.last_action_labels, self.inputs.disconnected, self._faded_events
+        if self.inputs.version != self._events_version:  # copy the input thread's dict only when it changed
+            self._events_version = self.inputs.version  # read first, a change during the copy bumps it again
+            self._events = tuple(self.inputs.last_events.items())
+        for device, (t, text) in self._events:
+            if device in last_action_labels:
+                label = last_action_labels[device]
+                if device in disconnected:
+                    faded.pop(device, None)
+                    set_(label, text='disconnected', bg=RED_FADE[0])
                     train = CONTROLS[device]
-                    self.control.deactivate(train, device)
-                else:
-                    fac = 1 - math.exp(t - now)
-                    label.config(text=text, bg=tk_rgb(int(255 * fac), 255, int(255 * fac)))
+                    control.deactivate(train, device)
+                elif faded.get(device) != t:  # nothing to do until the device sends a new event
+                    busy = busy or t > fading_since
+                    set_(label, text=text, bg=GREEN_FADE[fade_level(now - t)])
+                    if t <= fading_since:
+                        faded[device] = t
         # -- Highlight recent global commands ---
-        cause_text = lambda x: CONTROLS[x].name if x in CONTROLS else x
-        fac = 1 - math.exp(self.control.last_emergency_break_all[0] - now)
-        self.emergency_break_all_highlight.config(text=f"Emergency all: {cause_text(self.control.last_emergency_break_all[1])}", bg=tk_rgb(255, int(255 * fac), int(255 * fac)))
-        fac = 1 - math.exp(self.control.last_power_off[0] - now)
-        self.power_off_highlight.config(text=f"Power off: {cause_text(self.control.last_power_off[1])}", bg=tk_rgb(255, int(255 * fac), int(255 * fac)))
-        fac = 1 - math.exp(self.control.last_power_on[0] - now)
-        self.power_on_highlight.config(text=f"Power on: {cause_text(self.control.last_power_on[1])}", bg=tk_rgb(int(255 * fac), 255, int(255 * fac)))
+        cause_text = self._cause_text
+        (t_emergency, emergency_cause), (t_off, off_cause), (t_on, on_cause) = control.last_emergency_break_all, control.last_power_off, control.last_power_on
+        busy = busy or max(t_emergency, t_off, t_on) > fading_since
+        set_(self.emergency_break_all_highlight, text=cause_text("Emergency all", emergency_cause), bg=RED_FADE[fade_level(now - t_emergency)])
+        set_(self.power_off_highlight, text=cause_text("Power off", off_cause), bg=RED_FADE[fade_level(now - t_off)])
+        set_(self.power_on_highlight, text=cause_text("Power on", on_cause), bg=GREEN_FADE[fade_level(now - t_on)])
         # --- Update train display ---
-        for train in self.control.trains:
-            self.speed_bars[train].config(value=abs(100 * (self.control[train].speed or 0.) / train.max_speed))
-            self.direction_labels[train].config(text='🡄' if self.control[train].is_in_reverse else '🡆')
+        shown_states = self._shown_train_states
+        for train, speed_var, direction_label, percent_per_speed in self._train_view:
+            state = states[train]
+            speed = state.speed or 0.
+            busy = busy or speed != 0
+            shown = (speed, state.is_in_reverse)  # not target_speed: -0. == 0. would hide a direction change
+            if shown_states.get(train) == shown:
+                continue
+            shown_states[train] = shown
+            speed_var.set(abs(speed * percent_per_speed))  # only a Tcl variable write, no option parsing
+            set_(direction_label, text='🡄' if shown[1] else '🡆')
+        shown_active = self._shown_active
         for train, var in self.active_vars.items():
-            if bool(var.get()) != self.control[train].is_active:
-                var.set(int(self.control[train].is_active))
-        # --- Update status displays ---
-        for port in self.control.generator.get_open_ports():
-            error = self.control.generator.get_error(port)
-            if error:
-                signal_status = f"⛔ {error}"
-            elif self.control.generator.is_short_circuited(port):
-                signal_status = "⚠ short-circuited or no power"
-            elif self.control.generator.is_sending_on(port):
-                signal_status = "✅"
-            elif self.control.paused:
-                signal_status = "paused"
-            else:
-                signal_status = "⚠"
-            self.status_labels[port].config(text=signal_status)
-        # --- Relay ---
-        terminus_status = "✅" if self.relays.is_connected else " ⛔ " + self.relays.status
-        self.status_labels['terminus'].config(text=terminus_status)
-        # --- State ---
-        self.active_status.config(text="paused" if self.control.paused else "not paused")
-        self.light_status.config(text="on" if self.control.light else ("?" if self.control.light is None else "off"))
-        self.sound_status.config(text="on" if self.control.sound else ("?" if self.control.sound is None else "off"))
-        self.speed_limit.config(text=str(self.control.speed_limit))
+            is_active = states[train].is_active
+            if shown_active.get(train) != is_active:
+                var.set(int(is_active))
+                shown_active[train] = is_active
         # --- Terminus plan ---
-        if self.terminus:
+        terminus, move = self.terminus, self._move
+        if terminus:
+            positions = terminus.get_train_positions()
             for train, img_id in self.canvas_ids.items():
-                platform, pos = self.terminus.get_train_position(train)
+                platform, pos = positions.get(train, (None, None))
                 if platform:
-                    y = {1: 15, 2: 65, 3: 115, 4: 170, 5: 220}[platform]
+                    y = PLATFORM_Y[platform]
                     x = pos * (800/250) + 50 if pos is not None else 10
                 else:
                     x, y = -100, -100
-                self.canvas.coords(img_id, x, y)
+                move(img_id, x, y)
             if self.selected_platform is None:
-                self.canvas.coords(self.sel_platform, -100, -100, 1, 1)
+                move(self.sel_platform, -100, -100, 1, 1)
             else:
-                y = {1: 12, 2: 68, 3: 118, 4: 177, 5: 224}[self.selected_platform]
-                self.canvas.coords(self.sel_platform, 600, y, 800, y+10)
+                y = SELECTED_PLATFORM_Y[self.selected_platform]
+                move(self.sel_platform, 600, y, 800, y+10)
         # --- Schedule next update ---
-        self.window.after(10, self.update_ui)
+        if busy:  # keep a steady frame rate, but leave Tk at least as much time as this frame took
+            elapsed = int(1000 * (time.perf_counter() - now))
+            self.window.after(max(FRAME_INTERVAL - elapsed, elapsed, 1), self.update_ui)
+        else:
+            self.window.after(IDLE_INTERVAL, self.update_ui)
+
+    def _update_status(self):
+        # --- Update status displays ---
+        control, generator, set_ = self.control, self.control.generator, self._set
+        status_labels, paused = self.status_labels, control.paused
+        for port in self._open_ports:
+            error, short_circuited, sending = generator.get_status(port)
+            if error:
+                signal_status = f"⛔ {error}"
+            elif short_circuited:
+                signal_status = STATUS_SHORT_CIRCUITED
+            elif sending:
+                signal_status = STATUS_OK
+            elif paused:
+                signal_status = STATUS_PAUSED
+            else:
+                signal_status = STATUS_NOT_SENDING
+            set_(status_labels[port], text=signal_status)
+        # --- Relay ---
+        terminus_status = STATUS_OK if self.relays.is_connected else " ⛔ " + self.relays.status
+        set_(status_labels['terminus'], text=terminus_status)
+        # --- State ---
+        light, sound = control.light, control.sound
+        set_(self.active_status, text="paused" if paused else "not paused")
+        set_(self.light_status, text="on" if light else ("?" if light is None else "off"))
+        set_(self.sound_status, text="on" if sound else ("?" if sound is None else "off"))
+        set_(self.speed_limit, text=str(control.speed_limit))
+        self.window.after(STATUS_INTERVAL, self._update_status)
+
+    def _cause_text(self, prefix: str, cause: str) -> str:
+        """ Highlight text such as 'Power off: ICE', formatted once per cause. Causes are device paths or a few fixed strings. """
+        text = self._cause_texts.get((prefix, cause))
+        if text is None:
+            text = self._cause_texts[(prefix, cause)] = f"{prefix}: {self._cause_names.get(cause, cause)}"
+        return text
+
+    def _set(self, widget: tk.Misc, **config):
+        """ Configures `widget` unless the last call already wrote exactly this configuration, saving a round-trip through Tcl. """
+        values = tuple(config.items())
+        if self._widget_config.get(widget) != values:
+            self._widget_config[widget] = values
+            widget.tk.call(widget._w, 'configure', *[arg for key, value in values for arg in ('-' + key, value)])  # plain strings and numbers only, skips tkinter's option conversion
+
+    def _move(self, item: int, *coords):
+        """ Like `self.canvas.coords()` but skips the call if the item is already at `coords`. """
+        if self._item_coords.get(item) != coords:
+            self._item_coords[item] = coords
+            self.canvas.coords(item, *coords)
 
     # def toggle_active(self, train_id: int):
     #     if train_id >= len(self.shown_trains):
@@ -279,5 +355,7 @@ class TKGUI:
         os._exit(0)
 
 
-def tk_rgb(r, g, b):
-    return "#%02x%02x%02x" % (r, g, b)
+def thumbnail(train: Train) -> Image.Image:
+    """ Train image fitted into 80x30. """
+    return train.image.resize(fit_image_size(train.img_res, 80, 30))
+